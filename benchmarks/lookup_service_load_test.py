@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+
+import numpy as np
+from aiohttp import ClientSession, web
+from sqlalchemy import create_engine, event
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'books_dataset_normalization_and_analysis'))
+
+from database_schema_tables_definition import Base, Books, Authors, AuthorsBooks, Genres, GenresBooks
+from lookup_service import create_app, LOOKUP
+
+NUM_BOOKS = 20000
+NUM_AUTHORS = 5000
+NUM_GENRES = 200
+NUM_REQUESTS = 20000
+CONCURRENCY = 50
+BATCH_SIZE = 50
+
+def create_sqlite_database(path):
+    """
+    Create and populate a local SQLite database with synthetic books, authors and genres.
+
+    Parameters:
+    path (str): Path of the SQLite database file.
+
+    Returns:
+    sqlalchemy.engine.Engine: SQLAlchemy engine instance connected to the database.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+
+    # SQLite has no 'utf8mb4_unicode_ci' collation used by the books schema, register a plain one
+    @event.listens_for(engine, 'connect')
+    def register_collation(dbapi_connection, connection_record):
+        dbapi_connection.create_collation('utf8mb4_unicode_ci', lambda a, b: (a > b) - (a < b))
+
+    Base.metadata.create_all(engine)
+    rng = random.Random(0)
+    with engine.begin() as connection:
+        connection.execute(Books.__table__.insert(), [
+            {'index': book_id, 'book_id': book_id, 'title': f"Title {book_id}", 'description': "A book. " * 40,
+             'language': 'English', 'book_format': 'Paperback', 'pages': rng.randint(50, 900), 'price': rng.uniform(1, 40)}
+            for book_id in range(1, NUM_BOOKS + 1)
+        ])
+        connection.execute(Authors.__table__.insert(), [
+            {'author_id': author_id, 'author': f"Author {author_id}"} for author_id in range(1, NUM_AUTHORS + 1)
+        ])
+        connection.execute(Genres.__table__.insert(), [
+            {'genre_id': genre_id, 'genre': f"Genre {genre_id}"} for genre_id in range(1, NUM_GENRES + 1)
+        ])
+        connection.execute(AuthorsBooks.__table__.insert(), [
+            {'book_id': book_id, 'author_id': rng.randint(1, NUM_AUTHORS)} for book_id in range(1, NUM_BOOKS + 1)
+        ])
+        connection.execute(GenresBooks.__table__.insert(), [
+            {'book_id': book_id, 'genre_id': rng.randint(1, NUM_GENRES)}
+            for book_id in range(1, NUM_BOOKS + 1) for _ in range(3)
+        ])
+    return engine
+
+def request_plan(seed=0):
+    """
+    Build a reproducible mix of requests with a skewed key distribution, so a few keys are hot.
+
+    Returns:
+    list: Tuples of (method, path, json_body).
+    """
+    rng = random.Random(seed)
+    hot_book = lambda: min(int(rng.paretovariate(1.2)), NUM_BOOKS)
+    plan = []
+    for _ in range(NUM_REQUESTS):
+        kind = rng.random()
+        if kind < 0.7:
+            plan.append(('GET', f"/books/{hot_book()}", None))
+        elif kind < 0.8:
+            plan.append(('GET', f"/authors/{rng.randint(1, NUM_AUTHORS)}", None))
+        elif kind < 0.9:
+            plan.append(('GET', f"/genres/{rng.randint(1, NUM_GENRES)}", None))
+        else:
+            plan.append(('POST', "/books/batch", {'book_ids': [rng.randint(1, NUM_BOOKS) for _ in range(BATCH_SIZE)]}))
+    return plan
+
+async def run_load_test(engine, host='127.0.0.1', port=8765):
+    """
+    Serve the lookup application locally and replay the request plan with concurrent clients.
+
+    Prints p50/p99 latency per endpoint and overall requests per second.
+    """
+    app = create_app(engine)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    plan = request_plan()
+    latencies = {}
+    queue = asyncio.Queue()
+    for request in plan:
+        queue.put_nowait(request)
+
+    async def client(session):
+        while not queue.empty():
+            method, path, body = queue.get_nowait()
+            started = time.perf_counter()
+            async with session.request(method, f"http://{host}:{port}{path}", json=body) as response:
+                await response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"{method} {path} returned {response.status}")
+            endpoint = f"{method} /{path.split('/')[1]}" + ('/batch' if path.endswith('batch') else '')
+            latencies.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*[client(session) for _ in range(CONCURRENCY)])
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+
+    print(f"{'endpoint':<22}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for endpoint, values in sorted(latencies.items()):
+        print(f"{endpoint:<22}{len(values):>10}{np.percentile(values, 50):>10.2f}{np.percentile(values, 99):>10.2f}")
+    all_values = [value for values in latencies.values() for value in values]
+    print(f"{'all':<22}{len(all_values):>10}{np.percentile(all_values, 50):>10.2f}{np.percentile(all_values, 99):>10.2f}")
+
+    cache = app[LOOKUP].cache
+    print(f"\n{len(plan) / elapsed:.0f} requests/sec over {elapsed:.1f}s with {CONCURRENCY} concurrent clients")
+    print(f"Cache hit rate: {cache.hits / max(cache.hits + cache.misses, 1):.1%}")
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_database(os.path.join(directory, 'books.db'))
+        asyncio.run(run_load_test(engine))
+        engine.dispose()
@@ -0,0 +1,69 @@
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'books_dataset_normalization_and_analysis'))
+
+from data_cleaning_and_normalization import split_setting
+
+# Lookahead pattern previously used by transform_settings
+SETTING_SPLIT_REGEX = re.compile(r',\s*(?=[A-Z][a-z]*(?:\s[A-Z][a-z]*)*(?:\s\([A-Za-z\s]*\)))')
+
+SIZES = [1000, 4000, 16000, 64000]
+
+# Input generators, each building a string that grows linearly with n
+INPUTS = {
+    'typical settings': lambda n: ', '.join(['London, England (United Kingdom)', 'Paris (France)'] * n),
+    'list without parentheses': lambda n: ', '.join(['Middle Earth'] * n),
+    'long capitalized run': lambda n: 'Shire, ' + 'Aa ' * n,
+    'unclosed qualifier': lambda n: 'Shire, Aa (' + 'a ' * n,
+    'comma and whitespace runs': lambda n: (',' + ' ' * 20) * n,
+    'capitalized runs per comma': lambda n: ', '.join(['Aa Bb Cc Dd Ee Ff Gg'] * n) + ' x',
+}
+
+def regex_split_setting(setting):
+    """
+    Split a setting string with the previous regex implementation.
+
+    Parameters:
+    setting (str): Comma-separated settings of a book.
+
+    Returns:
+    list: The individual settings.
+    """
+    return SETTING_SPLIT_REGEX.split(setting)
+
+def best_time(function, argument, repeat=5):
+    """
+    Measure the best wall-clock time of a single call.
+
+    Parameters:
+    function (callable): Function to time.
+    argument (str): Argument passed to the function.
+    repeat (int): Number of timed calls.
+
+    Returns:
+    float: The fastest call time in milliseconds.
+    """
+    return min(timeit.repeat(lambda: function(argument), number=1, repeat=repeat)) * 1000
+
+def run_benchmark():
+    """
+    Time the regex and the linear tokenizer on growing inputs and check that their outputs agree.
+
+    For each input kind, prints the time per call and the time per thousand characters. A bounded
+    time per thousand characters as the input grows shows linear worst-case behaviour.
+    """
+    print(f"{'input':<28}{'chars':>10}{'regex ms':>12}{'tokenizer ms':>14}{'tokenizer ms/kchar':>20}")
+    for name, build in INPUTS.items():
+        for n in SIZES:
+            setting = build(n)
+            assert regex_split_setting(setting) == split_setting(setting), name
+
+            regex_ms = best_time(regex_split_setting, setting)
+            tokenizer_ms = best_time(split_setting, setting)
+            print(f"{name:<28}{len(setting):>10}{regex_ms:>12.2f}{tokenizer_ms:>14.2f}{tokenizer_ms / len(setting) * 1000:>20.4f}")
+
+if __name__ == "__main__":
+    run_benchmark()
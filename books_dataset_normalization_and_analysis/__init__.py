@@ -8,15 +8,19 @@ from data_cleaning_and_normalization import (
     data_cleaning, transform_authors, transform_awards, 
     transform_characters, transform_genres, 
     transform_publication_info, transform_ratings_and_bbe_scores, 
-    transform_settings, drop_columns
+    transform_settings, transform_descriptions, drop_columns
 )
 from database_schema_tables_definition import Base
-from data_utils import data_to_sql
+from data_utils import data_to_sql, read_csv_sample
+from data_sketches import SketchCollection, save_sketches
 
 if __name__ == "__main__":
     # Load environment variables
     CONNECTION_STRING = config('CONNECTION_STRING')
     CSV_PATH = config('CSV_PATH')
+    DEDUPLICATE_DESCRIPTIONS = config('DEDUPLICATE_DESCRIPTIONS', default=False, cast=bool)
+    SAMPLE_RATE = config('SAMPLE_RATE', default=1.0, cast=float)
+    COMPUTE_SKETCHES = config('COMPUTE_SKETCHES', default=False, cast=bool)
 
     # Create a database engine
     engine = create_engine(CONNECTION_STRING)
@@ -26,23 +30,35 @@ if __name__ == "__main__":
         create_database(engine.url)
     print("Database exists: ", database_exists(engine.url))
 
-    # Load CSV data into a pandas DataFrame
-    books = pd.read_csv(CSV_PATH)
+    # Load CSV data into a pandas DataFrame, optionally only a deterministic sample of the books
+    # (read_csv_sample rejects rates outside (0, 1])
+    if SAMPLE_RATE != 1:
+        books = read_csv_sample(CSV_PATH, SAMPLE_RATE)
+    else:
+        books = pd.read_csv(CSV_PATH)
     print("Dataset sample: \n", books.head(3))
 
     # Data cleaning and normalization
     books = data_cleaning(books)
 
+    # Optionally store each distinct description once, compressed, and reference it by hash,
+    # before the other transformations so the full texts are not kept for the rest of the run
+    if DEDUPLICATE_DESCRIPTIONS:
+        description_dictionaries, descriptions, books = transform_descriptions(books)
+
     # Create database tables based on the defined schema
     Base.metadata.create_all(engine)
 
+    # Optionally maintain approximate statistics (quantiles, distinct counts) while transforming
+    sketches = SketchCollection() if COMPUTE_SKETCHES else None
+
     # Transform data and insert into respective tables
-    authors, authors_books_bridge = transform_authors(books)
+    authors, authors_books_bridge = transform_authors(books, sketches)
     awards, awards_books_bridge = transform_awards(books)
     characters, characters_books_bridge = transform_characters(books)
-    genres, genres_books_bridge = transform_genres(books)
+    genres, genres_books_bridge = transform_genres(books, sketches)
     publication_info = transform_publication_info(books)
-    ratings_and_bbe_scores = transform_ratings_and_bbe_scores(books)
+    ratings_and_bbe_scores = transform_ratings_and_bbe_scores(books, sketches)
     settings, settings_books_bridge = transform_settings(books)
 
     # Drop unnecessary columns from the books DataFrame
@@ -64,10 +80,18 @@ if __name__ == "__main__":
         (settings, 'settings'),
         (settings_books_bridge, 'settings_books_bridge')
     ]
+    if DEDUPLICATE_DESCRIPTIONS:
+        data_table_pairs[:0] = [(description_dictionaries, 'description_dictionaries'), (descriptions, 'descriptions')]
 
     # Loop through each pair and call data_to_sql function
-    for data, table in data_table_pairs:
-        data_to_sql(data, table, engine)
+    inserted = [data_to_sql(data, table, engine) for data, table in data_table_pairs]
+
+    # Store the sketches of this run, which summarize the whole loaded dataset, only if it was fully inserted
+    if COMPUTE_SKETCHES:
+        if not all(inserted):
+            print("\nSketches not saved: some tables could not be inserted, see 'data_error.log'")
+        elif not save_sketches(sketches, engine, merge=False):
+            print("\nSketches could not be saved, see 'data_error.log'")
 
     # Close the connection associated with the provided SQLAlchemy engine and disposes of all associated resources, ensuring proper cleanup
     engine.dispose()
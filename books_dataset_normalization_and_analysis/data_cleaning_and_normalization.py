@@ -4,6 +4,12 @@ import numpy as np
 import pandas as pd
 from dateutil import parser
 
+from description_storage import (
+    hash_description, hash_dictionary, build_description_dictionary, compress_description
+)
+from data_sketches import QUANTILE_METRICS
+from data_utils import normalize_book_id
+
 def data_cleaning(dataset):
     """
     Clean and preprocess the dataset.
@@ -20,10 +26,7 @@ def data_cleaning(dataset):
             'num_ratings', 'ratings_by_stars', 'liked_percent', 'setting', 'cover_img',
             'bbe_score', 'bbe_votes', 'price']
 
-    def transform_book_id(text):
-        return text.split('-')[0].split('.')[0].strip()
-
-    dataset['book_id'] = dataset['book_id'].apply(transform_book_id)
+    dataset['book_id'] = dataset['book_id'].apply(normalize_book_id)
 
     dataset['author'] = dataset['author'].str.replace(', more…', '')
     dataset['pages'] = dataset['pages'].str.replace(' page', '')
@@ -46,12 +49,13 @@ def data_cleaning(dataset):
     print('Dataset sample after cleaning: \n', dataset.head(3))
     return dataset
 
-def transform_authors(dataset):
+def transform_authors(dataset, sketches=None):
     """
     Transform and extract author information from the dataset.
 
     Parameters:
     dataset (pd.DataFrame): The input dataset containing book information.
+    sketches (SketchCollection): Optional sketches updated with distinct author counts, overall and per book_format.
 
     Returns:
     tuple: A tuple containing two DataFrames:
@@ -62,6 +66,11 @@ def transform_authors(dataset):
     authors_exploded.loc[:, 'author'] = authors_exploded['author'].apply(lambda x: x.split(', ') if isinstance(x, str) else x)
     authors_exploded = authors_exploded.explode('author')
 
+    if sketches is not None:
+        authors_by_format = authors_exploded.join(dataset['book_format'])
+        sketches.update_distinct(authors_by_format, 'author')
+        sketches.update_distinct(authors_by_format, 'author', group_column='book_format')
+
     authors = authors_exploded[['author']].drop_duplicates().reset_index(drop=True)
     authors.index = authors.index + 1
     authors['author_id'] = authors.index
@@ -79,12 +88,13 @@ def transform_authors(dataset):
     print('\nAuthors df sample: \n', authors.head(3))
     return authors, authors_books_bridge
 
-def transform_genres(dataset):
+def transform_genres(dataset, sketches=None):
     """
     Transform and extract genre information from the dataset.
 
     Parameters:
     dataset (pd.DataFrame): The input dataset containing book information.
+    sketches (SketchCollection): Optional sketches updated with price and rating quantiles and distinct author counts per genre.
 
     Returns:
     tuple: A tuple containing two DataFrames:
@@ -96,6 +106,13 @@ def transform_genres(dataset):
     genres_exploded.loc[:, 'genres'] = genres_exploded['genres'].apply(lambda x: x.split(', ') if isinstance(x, str) else x)
     genres_exploded = genres_exploded.explode('genres')
 
+    if sketches is not None:
+        metrics_by_genre = genres_exploded.rename(columns={'genres': 'genre'}).join(dataset[QUANTILE_METRICS])
+        sketches.update_quantiles(metrics_by_genre, QUANTILE_METRICS, group_column='genre')
+
+        authors_by_genre = metrics_by_genre[['genre']].join(dataset['author'].str.split(', ')).explode('author')
+        sketches.update_distinct(authors_by_genre, 'author', group_column='genre')
+
     genres = genres_exploded[['genres']].drop_duplicates().reset_index(drop=True)
     genres.index = genres.index + 1
     genres['genre_id'] = genres.index
@@ -184,6 +201,42 @@ def transform_awards(dataset):
     print('\nAwards df sample: \n', awards.head(3))
     return awards, awards_books_bridge
 
+# Start of a setting: a place name followed by a parenthesized qualifier, e.g. 'New York (United States)'.
+# Each whitespace is followed by either a capitalized word or the qualifier, so matching never backtracks far.
+SETTING_START_PATTERN = re.compile(r'[A-Z][a-z]*(?:\s[A-Z][a-z]*)*\s\([A-Za-z\s]*\)')
+
+def split_setting(setting):
+    """
+    Split a setting string into individual settings.
+
+    A comma (and the whitespace after it) separates two settings only when the next setting
+    starts with a place name followed by a parenthesized qualifier, so 'London, England (United Kingdom)'
+    becomes 'London' and 'England (United Kingdom)', while commas followed by anything else are kept,
+    as in 'Washington, D.C. (United States)' or 'Middle Earth, The Shire'. Each comma-separated piece
+    is matched once, so the running time is linear in the length of the string.
+
+    Parameters:
+    setting (str): Comma-separated settings of a book.
+
+    Returns:
+    list: The individual settings.
+    """
+    if ',' not in setting:
+        return [setting]
+
+    pieces = setting.split(',')
+    parts = []
+    current = [pieces[0]]
+    for piece in pieces[1:]:
+        next_setting = piece.lstrip()
+        if SETTING_START_PATTERN.match(next_setting):
+            parts.append(','.join(current))
+            current = [next_setting]
+        else:
+            current.append(piece)
+    parts.append(','.join(current))
+    return parts
+
 def transform_settings(dataset):
     """
     Transform and extract setting information from the dataset.
@@ -199,11 +252,6 @@ def transform_settings(dataset):
     settings_exploded = dataset[['book_id', 'setting']]
     settings_exploded.loc[:, 'setting'] = settings_exploded['setting'].str.replace(r'\[|\]|\'', '', regex=True)
 
-    def split_setting(setting):
-        # Split by comma followed by a space only if not within parentheses
-        parts = re.split(r',\s*(?=[A-Z][a-z]*(?:\s[A-Z][a-z]*)*(?:\s\([A-Za-z\s]*\)))', setting)
-        return parts
-
     settings_exploded.loc[:, 'setting'] = settings_exploded['setting'].apply(lambda x: split_setting(x) if isinstance(x, str) else x)
     settings_exploded = settings_exploded.explode('setting')
 
@@ -224,12 +272,13 @@ def transform_settings(dataset):
     print('\nSettings df sample: \n', settings.head(3))
     return settings, settings_books_bridge
 
-def transform_ratings_and_bbe_scores(dataset):
+def transform_ratings_and_bbe_scores(dataset, sketches=None):
     """
     Transform and extract ratings and BBE scores from the dataset.
 
     Parameters:
     dataset (pd.DataFrame): The input dataset containing book information.
+    sketches (SketchCollection): Optional sketches updated with price and rating quantiles, overall and per book_format.
 
     Returns:
     pd.DataFrame: A DataFrame with transformed ratings and BBE scores information.
@@ -249,6 +298,11 @@ def transform_ratings_and_bbe_scores(dataset):
     ratings_and_bbe_scores = ratings_and_bbe_scores[['book_id', 'rating', 'num_ratings', '5_stars', '4_stars', '3_stars', '2_stars', '1_star', 'liked_percent', 'bbe_score', 'bbe_votes' ]]
     ratings_and_bbe_scores.rename(columns = {'5_stars':'five_stars', '4_stars':'four_stars', '3_stars':'three_stars', '2_stars':'two_stars', '1_star':'one_star'}, inplace = True)
 
+    if sketches is not None:
+        metrics_by_format = ratings_and_bbe_scores.join(dataset[['price', 'book_format']])
+        sketches.update_quantiles(metrics_by_format, QUANTILE_METRICS)
+        sketches.update_quantiles(metrics_by_format, QUANTILE_METRICS, group_column='book_format')
+
     print('\nRatings and BBE scores df sample: \n', ratings_and_bbe_scores.head(3))
     return ratings_and_bbe_scores
 
@@ -284,6 +338,48 @@ def transform_publication_info(dataset):
     print('\nPublication info df sample: \n', publication_info.head(3))
     return publication_info
 
+def transform_descriptions(dataset):
+    """
+    Deduplicate descriptions into a content-addressed, compressed table.
+
+    Each distinct description is stored once, keyed by its SHA-256 hash and compressed with a
+    zlib preset dictionary shared by all descriptions. The 'description' column of the dataset
+    is replaced by a 'description_hash' column referencing it.
+
+    Parameters:
+    dataset (pd.DataFrame): The input dataset containing book information.
+
+    Returns:
+    tuple: A tuple containing three DataFrames:
+        - description_dictionaries: DataFrame containing the shared dictionary, indexed by dictionary_id.
+        - descriptions: DataFrame containing unique compressed descriptions, indexed by description_hash.
+        - dataset: The input dataset with 'description' replaced by 'description_hash'.
+    """
+    unique_descriptions = pd.Series(dataset['description'].dropna().unique())
+    hashes = unique_descriptions.map(hash_description)
+
+    # The dictionary is empty when no phrase recurs; descriptions are then compressed without one
+    dictionary = build_description_dictionary(unique_descriptions.tolist())
+    dictionary_id = hash_dictionary(dictionary) if dictionary else None
+    description_dictionaries = pd.DataFrame(
+        {'dictionary': [dictionary] if dictionary else []},
+        index=pd.Index([dictionary_id] if dictionary else [], name='dictionary_id', dtype=object)
+    )
+
+    descriptions = pd.DataFrame({
+        'description_hash': hashes,
+        'description': unique_descriptions.map(lambda text: compress_description(text, dictionary)),
+        'dictionary_id': dictionary_id
+    })
+    descriptions.set_index('description_hash', inplace=True)
+
+    dataset['description_hash'] = dataset['description'].map(dict(zip(unique_descriptions, hashes)))
+    dataset.drop(columns=['description'], inplace=True)
+
+    del unique_descriptions, hashes
+    print(f'\nDescriptions deduplicated: {dataset["description_hash"].notna().sum()} books share {len(descriptions)} distinct descriptions')
+    return description_dictionaries, descriptions, dataset
+
 def drop_columns(dataset):
     """
     Drop unnecessary columns from the dataset.
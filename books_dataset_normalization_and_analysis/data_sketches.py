@@ -0,0 +1,376 @@
+import json
+import base64
+import logging
+import numpy as np
+import pandas as pd
+from sqlalchemy import exc, delete
+
+from database_schema_tables_definition import Sketches
+from data_utils import insert_statement
+
+# Metrics summarized by quantile sketches
+QUANTILE_METRICS = ['price', 'rating', 'num_ratings', 'bbe_score']
+
+# Group label used for sketches over the whole dataset
+OVERALL = 'all'
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch (KLL) with memory bounded by roughly 3 * k values.
+
+    Values are kept in levels of compactors; an item at level h stands for 2 ** h input values.
+    When a level exceeds its capacity it is sorted and every other item is promoted to the next level.
+
+    Attributes:
+    k (int): Accuracy parameter, the rank error is about 1.7 / k.
+    n (int): Number of values summarized.
+    min (float): Smallest value seen.
+    max (float): Largest value seen.
+    """
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(8, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        # Compact the lowest full level until the sketch fits its total capacity
+        while sum(len(items) for items in self._levels) > sum(self._capacity(level) for level in range(len(self._levels))):
+            level = next(level for level, items in enumerate(self._levels) if len(items) >= self._capacity(level))
+            items = np.sort(self._levels[level])
+            odd = len(items) % 2
+            if level + 1 == len(self._levels):
+                self._levels.append(np.empty(0))
+            promoted = items[odd + self._rng.integers(2)::2]
+            self._levels[level] = items[:odd]
+            self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+
+    def update(self, values):
+        """
+        Add values to the sketch, ignoring missing values.
+
+        Parameters:
+        values (array-like): Numeric values.
+        """
+        values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=float)
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """
+        Merge another KLLSketch into this one.
+
+        Parameters:
+        other (KLLSketch): The sketch to merge.
+        """
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def quantile(self, q):
+        """
+        Estimate the q-quantile of the summarized values.
+
+        Parameters:
+        q (float): Quantile between 0 and 1.
+
+        Returns:
+        float: The estimated quantile, or NaN if the sketch is empty.
+        """
+        if self.n == 0:
+            return np.nan
+        if q <= 0:
+            return float(self.min)
+        if q >= 1:
+            return float(self.max)
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level) for level, level_items in enumerate(self._levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(items[order][min(position, len(items) - 1)])
+
+    def to_dict(self):
+        """
+        Serialize the sketch into a JSON-compatible dict.
+        """
+        return {
+            'k': self.k, 'n': self.n,
+            'min': None if self.n == 0 else float(self.min),
+            'max': None if self.n == 0 else float(self.max),
+            'levels': [level_items.tolist() for level_items in self._levels]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore a sketch serialized with to_dict.
+        """
+        sketch = cls(data['k'])
+        sketch.n = data['n']
+        if sketch.n:
+            sketch.min, sketch.max = data['min'], data['max']
+        sketch._levels = [np.asarray(level_items, dtype=float) for level_items in data['levels']]
+        return sketch
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch (HyperLogLog) using 2 ** p one-byte registers.
+
+    Values are hashed with pandas' fixed-key hash, so sketches built in different runs can be merged.
+
+    Attributes:
+    p (int): Precision, the relative error is about 1.04 / sqrt(2 ** p).
+    """
+    def __init__(self, p=12):
+        self.p = p
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    @staticmethod
+    def _bit_length(words):
+        length = np.zeros(len(words), dtype=np.int64)
+        for shift in (32, 16, 8, 4, 2, 1):
+            wide = words >= (np.uint64(1) << np.uint64(shift))
+            words = np.where(wide, words >> np.uint64(shift), words)
+            length += wide * shift
+        return length + (words > 0)
+
+    def update(self, values):
+        """
+        Add values to the sketch, ignoring missing values.
+
+        Parameters:
+        values (array-like): Values of any type, compared by their string representation.
+        """
+        values = pd.Series(values).dropna()
+        if len(values) == 0:
+            return
+        hashes = pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+        suffix_bits = 64 - self.p
+        buckets = (hashes >> np.uint64(suffix_bits)).astype(np.int64)
+        suffixes = hashes & np.uint64((1 << suffix_bits) - 1)
+        ranks = (suffix_bits - self._bit_length(suffixes) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def merge(self, other):
+        """
+        Merge another HyperLogLog with the same precision into this one.
+
+        Parameters:
+        other (HyperLogLog): The sketch to merge.
+        """
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog sketches with precision {self.p} and {other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        """
+        Estimate the number of distinct values added.
+
+        Returns:
+        int: The estimated distinct count.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self):
+        """
+        Serialize the sketch into a JSON-compatible dict.
+        """
+        return {'p': self.p, 'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore a sketch serialized with to_dict.
+        """
+        sketch = cls(data['p'])
+        sketch.registers = np.frombuffer(base64.b64decode(data['registers']), dtype=np.uint8).copy()
+        return sketch
+
+SKETCH_TYPES = {'kll': KLLSketch, 'hll': HyperLogLog}
+
+class SketchCollection:
+    """
+    Sketches of several metrics, kept overall and per group (e.g. per book_format or genre).
+
+    Each sketch is keyed by (sketch_type, metric, group_column, group_value); sketches over the
+    whole dataset use OVERALL as both group_column and group_value.
+    """
+    def __init__(self):
+        self.sketches = {}
+
+    def _sketch(self, sketch_type, metric, group_column, group_value):
+        key = (sketch_type, metric, group_column, str(group_value))
+        if key not in self.sketches:
+            self.sketches[key] = SKETCH_TYPES[sketch_type]()
+        return self.sketches[key]
+
+    def _groups(self, frame, group_column):
+        if group_column is None:
+            return [(OVERALL, OVERALL, frame)]
+        return [(group_column, group_value, group) for group_value, group in frame.groupby(group_column, observed=True, sort=False)]
+
+    def update_quantiles(self, frame, metrics, group_column=None):
+        """
+        Add metric values to the quantile sketches of each group.
+
+        Parameters:
+        frame (pd.DataFrame): Data containing the metric columns and the group column.
+        metrics (list): Names of the numeric columns to summarize.
+        group_column (str): Column to group by, or None to update the overall sketches.
+        """
+        for column, group_value, group in self._groups(frame, group_column):
+            for metric in metrics:
+                self._sketch('kll', metric, column, group_value).update(group[metric])
+
+    def update_distinct(self, frame, metric, group_column=None):
+        """
+        Add values to the distinct-count sketch of each group.
+
+        Parameters:
+        frame (pd.DataFrame): Data containing the value column and the group column.
+        metric (str): Name of the column whose distinct values are counted.
+        group_column (str): Column to group by, or None to update the overall sketch.
+        """
+        for column, group_value, group in self._groups(frame, group_column):
+            self._sketch('hll', metric, column, group_value).update(group[metric])
+
+    def merge(self, other):
+        """
+        Merge the sketches of another SketchCollection into this one.
+
+        Parameters:
+        other (SketchCollection): The sketches to merge.
+        """
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = sketch
+
+    def quantile(self, metric, q, group_column=OVERALL, group_value=OVERALL):
+        """
+        Estimate a quantile of a metric, overall or within a group.
+
+        Parameters:
+        metric (str): Metric name, e.g. 'price'.
+        q (float): Quantile between 0 and 1.
+        group_column (str): Group column, e.g. 'book_format' or 'genre'.
+        group_value (str): Group value, e.g. 'Paperback'.
+
+        Returns:
+        float: The estimated quantile, or NaN if no values were recorded.
+        """
+        sketch = self.sketches.get(('kll', metric, group_column, str(group_value)))
+        return np.nan if sketch is None else sketch.quantile(q)
+
+    def distinct_count(self, metric, group_column=OVERALL, group_value=OVERALL):
+        """
+        Estimate the number of distinct values of a metric, overall or within a group.
+
+        Returns:
+        int: The estimated distinct count, 0 if no values were recorded.
+        """
+        sketch = self.sketches.get(('hll', metric, group_column, str(group_value)))
+        return 0 if sketch is None else sketch.count()
+
+    def to_frame(self):
+        """
+        Serialize the sketches into a DataFrame matching the 'sketches' table.
+
+        Returns:
+        pd.DataFrame: One row per sketch with its JSON representation.
+        """
+        return pd.DataFrame(
+            [(*key, json.dumps(sketch.to_dict())) for key, sketch in self.sketches.items()],
+            columns=['sketch_type', 'metric', 'group_column', 'group_value', 'sketch']
+        )
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        Restore sketches serialized with to_frame.
+
+        Parameters:
+        frame (pd.DataFrame): Rows of the 'sketches' table.
+
+        Returns:
+        SketchCollection: The restored sketches.
+        """
+        collection = cls()
+        for row in frame.itertuples(index=False):
+            key = (row.sketch_type, row.metric, row.group_column, row.group_value)
+            collection.sketches[key] = SKETCH_TYPES[row.sketch_type].from_dict(json.loads(row.sketch))
+        return collection
+
+def load_sketches(engine):
+    """
+    Load the persisted sketches from the 'sketches' table.
+
+    Parameters:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+
+    Returns:
+    SketchCollection: The stored sketches, empty if none were saved.
+    """
+    frame = pd.read_sql_table(Sketches.__tablename__, engine)
+    return SketchCollection.from_frame(frame)
+
+def save_sketches(sketches, engine, merge=True):
+    """
+    Persist sketches to the 'sketches' table, merging them with the stored ones by default.
+
+    Merging is only correct when the sketches summarize new rows, e.g. an incremental chunk
+    appended to the loaded data; sketches of a full reload should replace the stored ones.
+    The stored sketches are replaced in a single transaction, so they are kept if the write fails.
+
+    Parameters:
+    sketches (SketchCollection): The sketches to save.
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    merge (bool): Merge with the stored sketches instead of replacing them.
+
+    Returns:
+    bool: True if the sketches were saved, False otherwise.
+
+    Logs any SQLAlchemyError encountered during saving to 'data_error.log'.
+    """
+    try:
+        if merge:
+            stored = load_sketches(engine)
+            stored.merge(sketches)
+            sketches = stored
+
+        records = sketches.to_frame().to_dict('records')
+        with engine.begin() as connection:
+            if not merge:
+                connection.execute(delete(Sketches))
+            if records:
+                statement = insert_statement(Sketches.__table__, upsert=merge, dialect_name=connection.dialect.name)
+                connection.execute(statement, records)
+        print(f"{len(records)} sketches saved to '{Sketches.__tablename__}' successfully.")
+        return True
+    except exc.SQLAlchemyError as e:
+        logging.error("DataError: %s", e)
+        return False
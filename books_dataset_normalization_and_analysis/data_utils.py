@@ -1,8 +1,37 @@
 import logging
-from sqlalchemy import exc
+import datetime
+from itertools import islice
+import numpy as np
+import pandas as pd
+from sqlalchemy import exc, inspect, insert, select, Integer, Float, String, Text, Date
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from description_storage import decompress_description
+from database_schema_tables_definition import Base
 
 logging.basicConfig(filename='data_error.log', level=logging.ERROR)
 
+# Compact pandas dtypes for each SQLAlchemy column type, per dtype backend.
+# Floats stay double precision so values read back match what the loader wrote.
+SCHEMA_DTYPES = {
+    'numpy_nullable': {Integer: 'Int32', Float: 'float64', String: 'string', Text: 'string'},
+    'pyarrow': {Integer: 'int32[pyarrow]', Float: 'double[pyarrow]', String: 'string[pyarrow]', Text: 'string[pyarrow]'}
+}
+
+# Number of hash buckets used to select a sample of books
+SAMPLE_BUCKETS = 10000
+
+# Column of the raw CSV file holding the book identifier
+CSV_BOOK_ID_COLUMN = 'bookId'
+
+# Number of description hashes looked up per query, within the bound-parameter limits of the databases
+DESCRIPTION_HASHES_PER_QUERY = 1000
+
+# Low-cardinality text columns that are read back as categoricals
+CATEGORICAL_COLUMNS = {
+    'books': ['language', 'book_format']
+}
+
 def data_to_sql(df, table_name, engine):
     """
     Insert DataFrame into an SQL table using SQLAlchemy.
@@ -12,10 +41,436 @@ def data_to_sql(df, table_name, engine):
     table_name (str): Name of the SQL table to insert into.
     engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
 
+    Returns:
+    bool: True if the data was inserted, False otherwise.
+
     Logs any SQLAlchemyError encountered during insertion to 'data_error.log'.
     """
     try:
         df.to_sql(table_name, engine, if_exists='append')
         print(f"{df} data inserted successfully.")
+        return True
+    except exc.SQLAlchemyError as e:
+        logging.error("DataError: %s", e)
+        return False
+
+def insert_statement(table, upsert=False, dialect_name=None, columns=None):
+    """
+    Build a Core INSERT statement for a table, optionally as a dialect-specific upsert.
+
+    Upserts update the written non-primary-key columns of an existing row, leaving its other
+    columns untouched: 'ON DUPLICATE KEY UPDATE' on MySQL/MariaDB and 'ON CONFLICT (primary key)
+    DO UPDATE' on PostgreSQL and SQLite.
+
+    Parameters:
+    table (sqlalchemy.Table): The table to insert into.
+    upsert (bool): Update rows whose primary key already exists instead of failing.
+    dialect_name (str): Name of the database dialect, required when upsert is True.
+    columns (list): Names of the columns written by the statement, all table columns if None.
+
+    Returns:
+    sqlalchemy.sql.Insert: The insert statement.
+    """
+    if not upsert:
+        return insert(table)
+
+    primary_key = [column.name for column in table.primary_key]
+    updated = [name for name in (columns or table.columns.keys()) if name not in primary_key]
+
+    if dialect_name in ('mysql', 'mariadb'):
+        statement = mysql.insert(table)
+        # MySQL needs at least one assignment, so a table made only of key columns reassigns its key
+        return statement.on_duplicate_key_update({name: statement.inserted[name] for name in updated or primary_key})
+    if dialect_name in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+        statement = dialect_insert(table)
+        if not updated:
+            return statement.on_conflict_do_nothing(index_elements=primary_key)
+        return statement.on_conflict_do_update(
+            index_elements=primary_key, set_={name: statement.excluded[name] for name in updated}
+        )
+    raise ValueError(f"Upsert is not supported for the '{dialect_name}' dialect")
+
+def _check_columns(columns, table):
+    unknown = [name for name in columns if name not in table.columns]
+    if unknown:
+        raise ValueError(f"Columns {unknown} are not defined in table '{table.name}'")
+
+def _prepare_frame(frame, table, index=True):
+    index_label = frame.index.name or 'index'
+    if index and index_label in table.columns and index_label not in frame.columns:
+        frame = frame.reset_index(names=index_label)
+    _check_columns(frame.columns, table)
+    return frame
+
+def _date_columns(columns, table):
+    return [name for name in columns if isinstance(table.columns[name].type, Date)]
+
+def _typed_records(batch, table):
+    # Date columns become datetime.date and missing values (NaN, NaT, pd.NA) become NULL
+    date_columns = _date_columns(batch.columns, table)
+    if date_columns:
+        batch = batch.assign(**{name: pd.to_datetime(batch[name], errors='coerce').dt.date for name in date_columns})
+    batch = batch.astype(object)
+    return batch.where(batch.notna(), None).to_dict('records')
+
+def _frame_batches(frame, table, batch_size):
+    for start in range(0, len(frame), batch_size):
+        yield _typed_records(frame.iloc[start:start + batch_size], table)
+
+def _tuple_batches(rows, columns, table, batch_size):
+    # Records are built directly from the tuples, only Date values that are not dates yet are parsed
+    date_columns = _date_columns(columns, table)
+    missing = pd.NA
+    rows = iter(rows)
+    position = 0
+    while batch := list(islice(rows, batch_size)):
+        for offset, row in enumerate(batch):
+            if len(row) != len(columns):
+                raise ValueError(f"Row {position + offset} has {len(row)} values, expected {len(columns)} for columns {columns}")
+        position += len(batch)
+
+        # NaN and NaT are the only values not equal to themselves
+        records = [
+            {name: None if value is missing or value != value else value for name, value in zip(columns, row)}
+            for row in batch
+        ]
+        for name in date_columns:
+            pending = [record for record in records if record[name] is not None and type(record[name]) is not datetime.date]
+            if pending:
+                dates = pd.to_datetime(pd.Series([record[name] for record in pending], dtype=object), errors='coerce').dt.date
+                for record, date in zip(pending, dates):
+                    record[name] = None if date is pd.NaT else date
+        yield records
+
+def bulk_insert(model, rows, engine, columns=None, batch_size=10000, upsert=False):
+    """
+    Insert rows into a model's table with Core INSERT statements, without creating ORM objects.
+
+    Rows are sent in batches through executemany inside a single transaction, typed by the
+    table's column definitions: DataFrames, arrays and tuples alike have their Date columns
+    converted and missing values written as NULL.
+
+    Parameters:
+    model (type or str): Declarative model class (e.g. Books) or table name.
+    rows (pd.DataFrame, np.ndarray or iterable): A DataFrame, whose index is written like
+        df.to_sql does when it names a table column; a structured or 2-D NumPy array; or plain tuples.
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    columns (list): Column names of the tuples or 2-D array values, all table columns in order if None.
+    batch_size (int): Number of rows per executemany batch.
+    upsert (bool): Update the written columns of rows whose primary key already exists (see insert_statement).
+
+    Returns:
+    int: Number of rows inserted, or None if the insert failed.
+
+    Raises:
+    ValueError: If a column is not defined in the table or a tuple does not match 'columns'.
+
+    Logs any SQLAlchemyError encountered during insertion to 'data_error.log'.
+    """
+    table = Base.metadata.tables[model] if isinstance(model, str) else model.__table__
+    columns = list(columns or table.columns.keys())
+
+    if isinstance(rows, np.ndarray):
+        frame = pd.DataFrame(rows) if rows.dtype.names else pd.DataFrame(rows, columns=columns)
+        rows = _prepare_frame(frame, table, index=False)
+    elif isinstance(rows, pd.DataFrame):
+        rows = _prepare_frame(rows, table)
+
+    if isinstance(rows, pd.DataFrame):
+        columns = list(rows.columns)
+        batches = _frame_batches(rows, table, batch_size)
+    else:
+        _check_columns(columns, table)
+        batches = _tuple_batches(rows, columns, table, batch_size)
+
+    # Upserts only update the columns actually written, so partial rows keep their other values
+    statement = insert_statement(table, upsert, engine.dialect.name, columns)
+    inserted = 0
+    try:
+        with engine.begin() as connection:
+            for records in batches:
+                connection.execute(statement, records)
+                inserted += len(records)
+        print(f"{inserted} rows inserted into '{table.name}' successfully.")
+        return inserted
     except exc.SQLAlchemyError as e:
         logging.error("DataError: %s", e)
+        return None
+
+def normalize_book_id(text):
+    """
+    Extract the book identifier from a raw 'bookId' value, e.g. '2767052-the-hunger-games' -> '2767052'.
+
+    Parameters:
+    text (str): Raw 'bookId' value from the CSV file.
+
+    Returns:
+    str: The identifier prefix, converted to a number by data_cleaning.
+    """
+    return text.split('-')[0].split('.')[0].strip()
+
+def read_csv_sample(csv_path, sample_rate, chunksize=10000):
+    """
+    Read a deterministic sample of books from the CSV file in a single streaming pass.
+
+    A row is kept when the hash of its book identifier (see normalize_book_id), modulo SAMPLE_BUCKETS,
+    falls below sample_rate * SAMPLE_BUCKETS. All rows of a book are kept or dropped together and
+    the same books are selected on every run, so the transformed tables stay self-consistent.
+
+    Parameters:
+    csv_path (str): Path to the Best Books Ever CSV file.
+    sample_rate (float): Fraction of books to keep, in (0, 1].
+    chunksize (int): Number of CSV rows read per chunk.
+
+    Returns:
+    pd.DataFrame: The sampled rows with the original CSV columns.
+
+    Raises:
+    ValueError: If sample_rate is outside (0, 1] or too small to select any hash bucket.
+    """
+    if not 0 < sample_rate <= 1:
+        raise ValueError(f"sample_rate must be in (0, 1], got {sample_rate}")
+    threshold = round(sample_rate * SAMPLE_BUCKETS)
+    if threshold == 0:
+        raise ValueError(f"sample_rate {sample_rate} selects no books, the smallest usable rate is {0.5 / SAMPLE_BUCKETS}")
+
+    samples = []
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        book_ids = chunk[CSV_BOOK_ID_COLUMN].astype(str).apply(normalize_book_id)
+        buckets = pd.util.hash_pandas_object(book_ids, index=False) % SAMPLE_BUCKETS
+        samples.append(chunk[(buckets < threshold).to_numpy()])
+
+    sample = pd.concat(samples, ignore_index=True)
+    print(f"Sampled {len(sample)} rows at rate {sample_rate}")
+    return sample
+
+def read_descriptions(engine, description_hashes):
+    """
+    Read and decompress the descriptions with the given hashes.
+
+    Only the requested rows of 'descriptions' are selected, in chunks of DESCRIPTION_HASHES_PER_QUERY
+    hashes, and only the shared dictionaries they reference are loaded.
+
+    Parameters:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    description_hashes (list): Distinct description hashes.
+
+    Returns:
+    dict: Mapping of description_hash to description text, omitting unknown hashes.
+    """
+    descriptions = Base.metadata.tables['descriptions']
+    dictionaries = Base.metadata.tables['description_dictionaries']
+    # Descriptions stored before shared dictionaries were introduced are compressed without one
+    has_dictionary = 'dictionary_id' in table_columns(engine, 'descriptions')
+    selected = [descriptions.c.description_hash, descriptions.c.description]
+    if has_dictionary:
+        selected.append(descriptions.c.dictionary_id)
+
+    with engine.connect() as connection:
+        rows = []
+        for start in range(0, len(description_hashes), DESCRIPTION_HASHES_PER_QUERY):
+            chunk = description_hashes[start:start + DESCRIPTION_HASHES_PER_QUERY]
+            rows.extend(connection.execute(select(*selected).where(descriptions.c.description_hash.in_(chunk))).all())
+
+        dictionary_ids = {row[2] for row in rows if row[2] is not None} if has_dictionary else set()
+        shared = dict(connection.execute(
+            select(dictionaries.c.dictionary_id, dictionaries.c.dictionary)
+            .where(dictionaries.c.dictionary_id.in_(dictionary_ids))
+        ).all()) if dictionary_ids else {}
+
+    return {
+        row[0]: decompress_description(row[1], shared.get(row[2], b'') if has_dictionary else b'')
+        for row in rows
+    }
+
+def restore_descriptions(books, engine):
+    """
+    Replace description hashes in a books DataFrame with the decompressed description text.
+
+    Rows without a 'description_hash' keep their inline 'description'. Only the descriptions
+    referenced by the books are read, and each one is decompressed once, with the shared
+    dictionary it was compressed with.
+
+    Parameters:
+    books (pd.DataFrame): DataFrame read from the 'books' table.
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+
+    Returns:
+    pd.DataFrame: The books DataFrame with 'description' restored and 'description_hash' dropped.
+    """
+    if 'description_hash' not in books.columns:
+        return books
+
+    hashes = books['description_hash']
+    description_hashes = hashes.dropna().unique().tolist()
+    if description_hashes:
+        texts = read_descriptions(engine, description_hashes)
+        books['description'] = books['description'].where(hashes.isna(), hashes.map(texts))
+
+    return books.drop(columns=['description_hash'])
+
+def schema_dtypes(table_name, dtype_backend='numpy_nullable'):
+    """
+    Derive compact pandas dtypes for a table from its SQLAlchemy model.
+
+    Parameters:
+    table_name (str): Name of the SQL table defined in Base.metadata.
+    dtype_backend (str): Either 'numpy_nullable' or 'pyarrow'.
+
+    Returns:
+    tuple: A tuple containing:
+        - dtypes: dict mapping column names to pandas dtypes.
+        - parse_dates: list of date column names.
+    """
+    table = Base.metadata.tables[table_name]
+    dtypes, parse_dates = {}, []
+    for column in table.columns:
+        if isinstance(column.type, Date):
+            parse_dates.append(column.name)
+            continue
+        for column_type, dtype in SCHEMA_DTYPES[dtype_backend].items():
+            if isinstance(column.type, column_type):
+                dtypes[column.name] = dtype
+                break
+    return dtypes, parse_dates
+
+def table_columns(engine, table_name):
+    """
+    List the columns a table actually has in the database, which may predate the current schema.
+
+    Parameters:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    table_name (str): Name of the SQL table.
+
+    Returns:
+    list: Column names, empty if the table does not exist.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(table_name):
+        return []
+    return [column['name'] for column in inspector.get_columns(table_name)]
+
+def read_table(engine, table_name, columns=None, chunksize=10000, dtype_backend='numpy_nullable'):
+    """
+    Read a table in chunks through a server-side streaming cursor into a typed DataFrame.
+
+    Columns are checked against the table in the database, so databases created with an older
+    schema can still be read: without 'columns', schema columns missing from the table are skipped.
+
+    Parameters:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    table_name (str): Name of the SQL table defined in Base.metadata.
+    columns (list): Columns to read, all existing columns if None. The primary key is always read as the index.
+    chunksize (int): Number of rows fetched from the cursor per chunk.
+    dtype_backend (str): Either 'numpy_nullable' or 'pyarrow'.
+
+    Returns:
+    pd.DataFrame: The table data indexed by its primary key, with dtypes from schema_dtypes.
+
+    Raises:
+    ValueError: If a requested column does not exist in the database table.
+    """
+    table = Base.metadata.tables[table_name]
+    existing = table_columns(engine, table_name)
+    index_col = [column.name for column in table.primary_key]
+    if columns is None:
+        columns = [name for name in table.columns.keys() if name in existing]
+    else:
+        missing = [name for name in columns if name not in existing]
+        if missing:
+            raise ValueError(f"Columns {missing} do not exist in table '{table_name}', the database may predate them")
+    columns = [name for name in columns if name not in index_col]
+
+    dtypes, parse_dates = schema_dtypes(table_name, dtype_backend)
+    selected = index_col + columns
+    query = select(*[table.c[name] for name in selected])
+
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as connection:
+        chunks = pd.read_sql_query(
+            query, connection, index_col=index_col, chunksize=chunksize,
+            dtype={name: dtypes[name] for name in columns if name in dtypes},
+            parse_dates=[name for name in parse_dates if name in columns]
+        )
+        data = pd.concat(chunks)
+
+    for name in CATEGORICAL_COLUMNS.get(table_name, []):
+        if name in data.columns:
+            data[name] = data[name].astype('category')
+    return data
+
+def read_tables(engine, tables, chunksize=10000, dtype_backend='numpy_nullable'):
+    """
+    Read several tables with read_table.
+
+    Parameters:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    tables (dict): Mapping of table names to the list of columns to read (None for all columns).
+    chunksize (int): Number of rows fetched from the cursor per chunk.
+    dtype_backend (str): Either 'numpy_nullable' or 'pyarrow'.
+
+    Returns:
+    dict: Mapping of table names to DataFrames.
+    """
+    return {
+        table_name: read_table(engine, table_name, columns, chunksize, dtype_backend)
+        for table_name, columns in tables.items()
+    }
+
+def read_books(engine, columns=None, chunksize=10000, dtype_backend='numpy_nullable'):
+    """
+    Read the 'books' table, transparently decompressing deduplicated descriptions.
+
+    Parameters:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    columns (list): Columns to read, all columns if None.
+    chunksize (int): Number of rows fetched from the cursor per chunk.
+    dtype_backend (str): Either 'numpy_nullable' or 'pyarrow'.
+
+    Returns:
+    pd.DataFrame: The books DataFrame indexed by 'index'.
+    """
+    if columns is not None and 'description' in columns and 'description_hash' not in columns \
+            and 'description_hash' in table_columns(engine, 'books'):
+        columns = list(columns) + ['description_hash']
+    books = read_table(engine, 'books', columns, chunksize, dtype_backend)
+    return restore_descriptions(books, engine)
+
+def read_books_denormalized(engine, chunksize=10000, dtype_backend='numpy_nullable'):
+    """
+    Rebuild the per-book view with authors, genres and ratings joined in a single pass.
+
+    Author and genre names are resolved through the bridge tables and collapsed to one
+    comma-separated string per book, then joined to books and ratings together on book_id.
+
+    Parameters:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    chunksize (int): Number of rows fetched from the cursor per chunk.
+    dtype_backend (str): Either 'numpy_nullable' or 'pyarrow'.
+
+    Returns:
+    pd.DataFrame: One row per book indexed by book_id.
+    """
+    tables = read_tables(engine, {
+        'authors': None,
+        'authors_books_bridge': ['book_id', 'author_id'],
+        'genres': None,
+        'genres_books_bridge': ['book_id', 'genre_id'],
+        'ratings_and_bbe_scores': None
+    }, chunksize, dtype_backend)
+    books = read_books(engine, chunksize=chunksize, dtype_backend=dtype_backend)
+
+    def names_per_book(bridge, names, id_column, name_column):
+        per_book = pd.DataFrame({
+            'book_id': bridge['book_id'],
+            name_column: bridge[id_column].map(names).astype(object)
+        }).dropna()
+        names_joined = per_book.groupby('book_id', sort=False)[name_column].agg(', '.join)
+        return names_joined.astype(SCHEMA_DTYPES[dtype_backend][String])
+
+    authors = names_per_book(tables['authors_books_bridge'], tables['authors']['author'], 'author_id', 'author')
+    genres = names_per_book(tables['genres_books_bridge'], tables['genres']['genre'], 'genre_id', 'genres')
+    ratings = tables['ratings_and_bbe_scores'].dropna(subset=['book_id']).set_index('book_id')
+
+    books = books.dropna(subset=['book_id']).set_index('book_id')
+    return books.join([authors.to_frame(), genres.to_frame(), ratings], how='left')
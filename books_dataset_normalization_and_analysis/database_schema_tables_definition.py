@@ -1,6 +1,6 @@
 from sqlalchemy import (
     create_engine, ForeignKey, ForeignKeyConstraint,
-    Column, String, Integer, Float, Text, Date
+    Column, String, Integer, Float, Text, Date, LargeBinary
 )
 from sqlalchemy.orm import declarative_base
 from decouple import config 
@@ -24,6 +24,7 @@ class Books(Base):
     pages (int): Number of pages in the book.
     cover_img (str): URL or path to the cover image of the book.
     price (float): Price of the book.
+    description_hash (str): Foreign key to 'descriptions' table, set instead of description when descriptions are deduplicated.
     """
     __tablename__ = "books"
 
@@ -39,8 +40,9 @@ class Books(Base):
     pages = Column(Integer)
     cover_img = Column(String(255))
     price = Column(Float)
+    description_hash = Column(String(64), ForeignKey('descriptions.description_hash'), index=True)
 
-    def __init__(self, index, book_id, title, series, description, language, isbn, book_format, edition, pages, cover_img, price):
+    def __init__(self, index, book_id, title, series, description, language, isbn, book_format, edition, pages, cover_img, price, description_hash=None):
         self.index = index
         self.book_id = book_id
         self.title = title
@@ -53,14 +55,59 @@ class Books(Base):
         self.pages = pages
         self.cover_img = cover_img
         self.price = price
+        self.description_hash = description_hash
 
     def __repr__(self):
         return (
         f"<Books(index={self.index}, book_id={self.book_id}, title={self.title}, series={self.series}, "
         f"description={self.description}, language={self.language}, isbn={self.isbn}, book_format={self.book_format}, "
-        f"edition={self.edition}, pages={self.pages}, cover_img={self.cover_img}, price={self.price})>"
+        f"edition={self.edition}, pages={self.pages}, cover_img={self.cover_img}, price={self.price}, "
+        f"description_hash={self.description_hash})>"
         )
 
+class Descriptions(Base):
+    """
+    SQLAlchemy model for the 'descriptions' table.
+
+    Attributes:
+    description_hash (str): Primary key, SHA-256 hex digest of the description text.
+    description (bytes): zlib-compressed UTF-8 description text.
+    dictionary_id (str): Foreign key to 'description_dictionaries' table, the preset dictionary used for compression.
+    """
+    __tablename__ = "descriptions"
+
+    description_hash = Column(String(64), primary_key=True, unique=True, index=True)
+    description = Column(LargeBinary(length=2**24 - 1))
+    dictionary_id = Column(String(64), ForeignKey('description_dictionaries.dictionary_id'))
+
+    def __init__(self, description_hash, description, dictionary_id=None):
+        self.description_hash = description_hash
+        self.description = description
+        self.dictionary_id = dictionary_id
+
+    def __repr__(self):
+        return f"<Descriptions(description_hash={self.description_hash}, description=<{len(self.description or b'')} bytes>, dictionary_id={self.dictionary_id})>"
+
+class DescriptionDictionaries(Base):
+    """
+    SQLAlchemy model for the 'description_dictionaries' table.
+
+    Attributes:
+    dictionary_id (str): Primary key, SHA-256 hex digest of the dictionary.
+    dictionary (bytes): Shared zlib preset dictionary built from recurring description phrases.
+    """
+    __tablename__ = "description_dictionaries"
+
+    dictionary_id = Column(String(64), primary_key=True, unique=True, index=True)
+    dictionary = Column(LargeBinary)
+
+    def __init__(self, dictionary_id, dictionary):
+        self.dictionary_id = dictionary_id
+        self.dictionary = dictionary
+
+    def __repr__(self):
+        return f"<DescriptionDictionaries(dictionary_id={self.dictionary_id}, dictionary=<{len(self.dictionary or b'')} bytes>)>"
+
 class Authors(Base):
     """
     SQLAlchemy model for the 'authors' table.
@@ -97,8 +144,8 @@ class AuthorsBooks(Base):
     )
 
     index = Column(Integer, primary_key=True, index=True)
-    book_id = Column(Integer)
-    author_id = Column(Integer)
+    book_id = Column(Integer, index=True)
+    author_id = Column(Integer, index=True)
 
     def __init__(self, index, book_id, author_id):
         self.index = index
@@ -144,8 +191,8 @@ class GenresBooks(Base):
     )
 
     index = Column(Integer, primary_key=True)
-    book_id = Column(Integer)
-    genre_id = Column(Integer)
+    book_id = Column(Integer, index=True)
+    genre_id = Column(Integer, index=True)
 
     def __init__(self, index, book_id, genre_id):
         self.index = index
@@ -191,8 +238,8 @@ class CharactersBooks(Base):
     )
 
     index = Column(Integer, primary_key=True)
-    book_id = Column(Integer)
-    character_id = Column(Integer)
+    book_id = Column(Integer, index=True)
+    character_id = Column(Integer, index=True)
 
     def __init__(self, index, book_id, character_id):
         self.index = index
@@ -238,8 +285,8 @@ class AwardsBooks(Base):
     )
 
     index = Column(Integer, primary_key=True)
-    book_id = Column(Integer)
-    award_id = Column(Integer)
+    book_id = Column(Integer, index=True)
+    award_id = Column(Integer, index=True)
 
     def __init__(self, index, book_id, award_id):
         self.index = index
@@ -285,8 +332,8 @@ class SettingsBooks(Base):
     )
 
     index = Column(Integer, primary_key=True)
-    book_id = Column(Integer)
-    setting_id = Column(Integer)
+    book_id = Column(Integer, index=True)
+    setting_id = Column(Integer, index=True)
 
     def __init__(self, index, book_id, setting_id):
         self.index = index
@@ -374,3 +421,32 @@ class PublicationInfo(Base):
         
     def __repr__(self):
         return f"<PublicationInfo(index={self.index}, book_id={self.book_id}, publisher={self.publisher}, publish_date={self.publish_date}, first_publish_date={self.first_publish_date})>"
+
+class Sketches(Base):
+    """
+    SQLAlchemy model for the 'sketches' table.
+
+    Attributes:
+    sketch_type (str): Primary key part, 'kll' for quantile sketches or 'hll' for distinct-count sketches.
+    metric (str): Primary key part, name of the summarized column (e.g. price, author).
+    group_column (str): Primary key part, column the data was grouped by, or 'all'.
+    group_value (str): Primary key part, value of the group column, or 'all'.
+    sketch (str): JSON serialized sketch.
+    """
+    __tablename__ = 'sketches'
+
+    sketch_type = Column(String(20), primary_key=True)
+    metric = Column(String(50), primary_key=True)
+    group_column = Column(String(50), primary_key=True)
+    group_value = Column(String(255), primary_key=True)
+    sketch = Column(Text)
+
+    def __init__(self, sketch_type, metric, group_column, group_value, sketch):
+        self.sketch_type = sketch_type
+        self.metric = metric
+        self.group_column = group_column
+        self.group_value = group_value
+        self.sketch = sketch
+
+    def __repr__(self):
+        return f"<Sketches(sketch_type={self.sketch_type}, metric={self.metric}, group_column={self.group_column}, group_value={self.group_value})>"
\ No newline at end of file
@@ -0,0 +1,98 @@
+import zlib
+import hashlib
+from collections import Counter
+
+# zlib can only reference the last 32 KB of a preset dictionary
+DICTIONARY_SIZE = 32768
+
+def hash_description(text):
+    """
+    Compute the content hash used to reference a description.
+
+    Parameters:
+    text (str): The description text.
+
+    Returns:
+    str: SHA-256 hex digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def hash_dictionary(dictionary):
+    """
+    Compute the content hash used to reference a compression dictionary.
+
+    Parameters:
+    dictionary (bytes): The preset dictionary.
+
+    Returns:
+    str: SHA-256 hex digest of the dictionary.
+    """
+    return hashlib.sha256(dictionary).hexdigest()
+
+def build_description_dictionary(texts, size=DICTIONARY_SIZE, sample_size=5000, phrase_length=3):
+    """
+    Build a shared zlib preset dictionary from the phrases that recur across descriptions.
+
+    Word n-grams are counted over an evenly spaced sample of the texts; phrases found more than
+    once are ranked by count times length and the best ones are packed into the dictionary,
+    the most valuable last, where zlib reaches them with the shortest match distance.
+
+    Parameters:
+    texts (list): Distinct description texts.
+    size (int): Maximum dictionary size in bytes.
+    sample_size (int): Maximum number of texts sampled.
+    phrase_length (int): Number of words per phrase.
+
+    Returns:
+    bytes: The preset dictionary, empty if no phrase recurs.
+    """
+    step = max(1, len(texts) // sample_size)
+    counts = Counter()
+    for text in texts[::step]:
+        words = text.split()
+        counts.update(set(' '.join(words[start:start + phrase_length]) for start in range(len(words) - phrase_length + 1)))
+
+    phrases = sorted(
+        (phrase for phrase, count in counts.items() if count > 1),
+        key=lambda phrase: (-counts[phrase] * len(phrase), phrase)
+    )
+    chosen, used = [], 0
+    for phrase in phrases:
+        encoded = phrase.encode('utf-8') + b' '
+        if used + len(encoded) > size:
+            break
+        chosen.append(encoded)
+        used += len(encoded)
+    return b''.join(reversed(chosen))
+
+def compress_description(text, dictionary=b''):
+    """
+    Compress a description for storage in the 'descriptions' table.
+
+    Parameters:
+    text (str): The description text.
+    dictionary (bytes): Optional shared preset dictionary.
+
+    Returns:
+    bytes: zlib-compressed UTF-8 encoded text.
+    """
+    if not dictionary:
+        return zlib.compress(text.encode('utf-8'), 9)
+    compressor = zlib.compressobj(9, zdict=dictionary)
+    return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+def decompress_description(data, dictionary=b''):
+    """
+    Restore a description compressed with compress_description.
+
+    Parameters:
+    data (bytes): zlib-compressed UTF-8 encoded text.
+    dictionary (bytes): The preset dictionary used for compression, if any.
+
+    Returns:
+    str: The description text.
+    """
+    if not dictionary:
+        return zlib.decompress(data).decode('utf-8')
+    decompressor = zlib.decompressobj(zdict=dictionary)
+    return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
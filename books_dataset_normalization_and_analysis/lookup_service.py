@@ -0,0 +1,291 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+from aiohttp import web
+from decouple import config
+from sqlalchemy import create_engine, inspect, select
+
+from description_storage import decompress_description
+from database_schema_tables_definition import (
+    Books, Descriptions, DescriptionDictionaries, Authors, AuthorsBooks, Genres, GenresBooks
+)
+
+class TTLCache:
+    """
+    Bounded least-recently-used cache whose entries expire after a fixed time to live.
+
+    Attributes:
+    maxsize (int): Maximum number of entries kept.
+    ttl (float): Seconds an entry stays valid after it is stored.
+    hits (int): Number of lookups served from the cache.
+    misses (int): Number of lookups not found or expired.
+    """
+    def __init__(self, maxsize=10000, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        """
+        Store value for key, evicting the least recently used entries beyond maxsize.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class BookLookup:
+    """
+    Read-only lookups of books, authors and genres over the normalized database, with caching.
+
+    Queries run on the pooled SQLAlchemy engine in a worker thread so they do not block the event loop.
+    Batch lookups fetch all requested books with one query per table. The shared description
+    dictionaries are loaded once and kept for the lifetime of the lookup. Columns are reflected
+    from the database, so databases created before descriptions were deduplicated are served too.
+
+    Attributes:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    cache (TTLCache): Cache of lookup results keyed by (kind, id).
+    """
+    def __init__(self, engine, cache_size=10000, cache_ttl=300.0):
+        self.engine = engine
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._dictionaries = {}
+        self._books_query = None
+
+    def _dictionary(self, connection, dictionary_id):
+        if dictionary_id is None:
+            return b''
+        if dictionary_id not in self._dictionaries:
+            query = select(DescriptionDictionaries.dictionary).where(DescriptionDictionaries.dictionary_id == dictionary_id)
+            self._dictionaries[dictionary_id] = connection.execute(query).scalar() or b''
+        return self._dictionaries[dictionary_id]
+
+    def _build_books_query(self, connection):
+        inspector = inspect(connection)
+        books_columns = [column['name'] for column in inspector.get_columns(Books.__tablename__)]
+        query = select(*[column for column in Books.__table__.columns if column.name in books_columns])
+        if 'description_hash' not in books_columns:
+            return query
+
+        description_columns = [Descriptions.description.label('compressed_description')]
+        if 'dictionary_id' in [column['name'] for column in inspector.get_columns(Descriptions.__tablename__)]:
+            description_columns.append(Descriptions.dictionary_id)
+        return (
+            query.add_columns(*description_columns)
+            .outerjoin(Descriptions, Books.description_hash == Descriptions.description_hash)
+        )
+
+    def _fetch_books(self, book_ids):
+        authors_query = (
+            select(AuthorsBooks.book_id, Authors.author)
+            .join(Authors, AuthorsBooks.author_id == Authors.author_id)
+            .where(AuthorsBooks.book_id.in_(book_ids))
+            .order_by(AuthorsBooks.index)
+        )
+        genres_query = (
+            select(GenresBooks.book_id, Genres.genre)
+            .join(Genres, GenresBooks.genre_id == Genres.genre_id)
+            .where(GenresBooks.book_id.in_(book_ids))
+            .order_by(GenresBooks.index)
+        )
+
+        with self.engine.connect() as connection:
+            if self._books_query is None:
+                self._books_query = self._build_books_query(connection)
+            books_query = self._books_query.where(Books.book_id.in_(book_ids))
+
+            books = {}
+            for row in connection.execute(books_query).mappings():
+                book = dict(row)
+                compressed_description = book.pop('compressed_description', None)
+                dictionary_id = book.pop('dictionary_id', None)
+                book.pop('description_hash', None)
+                if compressed_description is not None:
+                    book['description'] = decompress_description(compressed_description, self._dictionary(connection, dictionary_id))
+                book['authors'], book['genres'] = [], []
+                books[book['book_id']] = book
+
+            for book_id, author in connection.execute(authors_query):
+                if book_id in books and author is not None:
+                    books[book_id]['authors'].append(author)
+            for book_id, genre in connection.execute(genres_query):
+                if book_id in books and genre is not None:
+                    books[book_id]['genres'].append(genre)
+        return books
+
+    async def get_books(self, book_ids):
+        """
+        Look up many books at once, fetching only the cache misses from the database.
+
+        Parameters:
+        book_ids (list): Book identifiers to look up.
+
+        Returns:
+        dict: Mapping of book_id to book data, omitting unknown books.
+        """
+        found, missing = {}, []
+        for book_id in dict.fromkeys(book_ids):
+            book = self.cache.get(('book', book_id))
+            if book is None:
+                missing.append(book_id)
+            else:
+                found[book_id] = book
+
+        if missing:
+            fetched = await asyncio.to_thread(self._fetch_books, missing)
+            for book_id, book in fetched.items():
+                self.cache.put(('book', book_id), book)
+            found.update(fetched)
+        return found
+
+    async def _get_named_entity(self, kind, entity_id, model, bridge, id_column, name_column):
+        key = (kind, entity_id)
+        entity = self.cache.get(key)
+        if entity is not None:
+            return entity
+
+        def fetch():
+            name_query = select(getattr(model, name_column)).where(getattr(model, id_column) == entity_id)
+            books_query = (
+                select(bridge.book_id)
+                .where(getattr(bridge, id_column) == entity_id)
+                .order_by(bridge.book_id)
+            )
+            with self.engine.connect() as connection:
+                name = connection.execute(name_query).first()
+                if name is None:
+                    return None
+                book_ids = connection.execute(books_query).scalars().all()
+            return {id_column: entity_id, name_column: name[0], 'book_ids': book_ids}
+
+        entity = await asyncio.to_thread(fetch)
+        if entity is not None:
+            self.cache.put(key, entity)
+        return entity
+
+    async def get_author(self, author_id):
+        """
+        Look up an author and the identifiers of their books.
+
+        Returns:
+        dict: Author data, or None if the author does not exist.
+        """
+        return await self._get_named_entity('author', author_id, Authors, AuthorsBooks, 'author_id', 'author')
+
+    async def get_genre(self, genre_id):
+        """
+        Look up a genre and the identifiers of its books.
+
+        Returns:
+        dict: Genre data, or None if the genre does not exist.
+        """
+        return await self._get_named_entity('genre', genre_id, Genres, GenresBooks, 'genre_id', 'genre')
+
+LOOKUP = web.AppKey('lookup', BookLookup)
+MAX_BATCH_SIZE = web.AppKey('max_batch_size', int)
+
+def _parse_id(request, name):
+    try:
+        return int(request.match_info[name])
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+
+async def get_book(request):
+    lookup = request.app[LOOKUP]
+    book_id = _parse_id(request, 'book_id')
+    books = await lookup.get_books([book_id])
+    if book_id not in books:
+        raise web.HTTPNotFound(text=f"Book {book_id} not found")
+    return web.json_response(books[book_id])
+
+async def get_books_batch(request):
+    lookup = request.app[LOOKUP]
+    try:
+        payload = await request.json()
+        book_ids = [int(book_id) for book_id in payload['book_ids']]
+    except (ValueError, KeyError, TypeError):
+        raise web.HTTPBadRequest(text="Expected a JSON body like {\"book_ids\": [1, 2, 3]}")
+    if len(book_ids) > request.app[MAX_BATCH_SIZE]:
+        raise web.HTTPBadRequest(text=f"At most {request.app[MAX_BATCH_SIZE]} book_ids per batch")
+
+    books = await lookup.get_books(book_ids)
+    return web.json_response({'books': [books[book_id] for book_id in dict.fromkeys(book_ids) if book_id in books]})
+
+async def get_author(request):
+    author_id = _parse_id(request, 'author_id')
+    author = await request.app[LOOKUP].get_author(author_id)
+    if author is None:
+        raise web.HTTPNotFound(text=f"Author {author_id} not found")
+    return web.json_response(author)
+
+async def get_genre(request):
+    genre_id = _parse_id(request, 'genre_id')
+    genre = await request.app[LOOKUP].get_genre(genre_id)
+    if genre is None:
+        raise web.HTTPNotFound(text=f"Genre {genre_id} not found")
+    return web.json_response(genre)
+
+def create_app(engine, cache_size=10000, cache_ttl=300.0, max_batch_size=1000):
+    """
+    Create the lookup web application.
+
+    Routes:
+    GET /books/{book_id}: A book with its authors and genres.
+    POST /books/batch: Many books at once, body {"book_ids": [...]}.
+    GET /authors/{author_id}: An author with the identifiers of their books.
+    GET /genres/{genre_id}: A genre with the identifiers of its books.
+
+    Parameters:
+    engine (sqlalchemy.engine.Engine): SQLAlchemy engine instance connected to the database.
+    cache_size (int): Maximum number of cached lookups.
+    cache_ttl (float): Seconds a cached lookup stays valid.
+    max_batch_size (int): Maximum number of book_ids accepted by a batch request.
+
+    Returns:
+    aiohttp.web.Application: The configured application.
+    """
+    app = web.Application()
+    app[LOOKUP] = BookLookup(engine, cache_size, cache_ttl)
+    app[MAX_BATCH_SIZE] = max_batch_size
+    app.add_routes([
+        web.get('/books/{book_id}', get_book),
+        web.post('/books/batch', get_books_batch),
+        web.get('/authors/{author_id}', get_author),
+        web.get('/genres/{genre_id}', get_genre),
+    ])
+    return app
+
+if __name__ == "__main__":
+    # Load environment variables
+    CONNECTION_STRING = config('CONNECTION_STRING')
+    LOOKUP_HOST = config('LOOKUP_HOST', default='127.0.0.1')
+    LOOKUP_PORT = config('LOOKUP_PORT', default=8080, cast=int)
+    LOOKUP_CACHE_SIZE = config('LOOKUP_CACHE_SIZE', default=10000, cast=int)
+    LOOKUP_CACHE_TTL = config('LOOKUP_CACHE_TTL', default=300.0, cast=float)
+
+    # Create a pooled database engine shared by all requests
+    engine = create_engine(CONNECTION_STRING, pool_size=10, max_overflow=10, pool_pre_ping=True)
+
+    web.run_app(create_app(engine, LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL), host=LOOKUP_HOST, port=LOOKUP_PORT)
+    engine.dispose()
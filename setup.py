@@ -25,6 +25,9 @@ setup(
         'SQLAlchemy==2.0.30',
         'SQLAlchemy-Utils==0.41.2'
     ],
+    extras_require={
+        'service': ['aiohttp==3.9.5']
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'books_dataset_normalization_and_analysis'))
+
+from database_schema_tables_definition import Sketches
+from data_sketches import KLLSketch, HyperLogLog, SketchCollection, OVERALL, load_sketches, save_sketches
+
+def build_kll(chunks, k=200):
+    """
+    Build one KLL sketch per chunk and merge them all into the first.
+    """
+    sketches = []
+    for chunk in chunks:
+        sketch = KLLSketch(k)
+        sketch.update(chunk)
+        sketches.append(sketch)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    return merged
+
+def rank_errors(sketch, values, quantiles):
+    """
+    Absolute differences between the requested quantiles and the true ranks of the estimates.
+    """
+    values = np.sort(values)
+    return [abs(np.searchsorted(values, sketch.quantile(q), side='right') / len(values) - q) for q in quantiles]
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sketches.db'}")
+    Sketches.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+def test_kll_rank_error_after_many_merges():
+    rng = np.random.default_rng(1)
+    chunks = [rng.lognormal(3, 1, size=rng.integers(100, 5000)) for _ in range(200)]
+    sketch = build_kll(chunks)
+    values = np.concatenate(chunks)
+
+    assert sketch.n == len(values)
+    assert sketch.quantile(0) == values.min()
+    assert sketch.quantile(1) == values.max()
+    # k=200 gives a rank error of about 1.7 / k, allow a wide margin for the random compactions
+    assert max(rank_errors(sketch, values, np.linspace(0.01, 0.99, 99))) < 0.02
+    # Memory stays bounded by roughly 3 * k retained values
+    assert sum(len(level) for level in sketch._levels) <= 3 * sketch.k
+
+def test_kll_ignores_missing_values():
+    sketch = KLLSketch()
+    sketch.update([1.0, None, np.nan, '3', 'n/a'])
+    assert sketch.n == 2
+    assert np.isnan(KLLSketch().quantile(0.5))
+
+def test_hll_count_within_expected_error():
+    values = np.arange(200000)
+    sketch = HyperLogLog(p=12)
+    for chunk in np.array_split(values, 50):
+        part = HyperLogLog(p=12)
+        # Repeated values must not inflate the count
+        part.update(np.concatenate([chunk, chunk]))
+        sketch.merge(part)
+
+    # Standard error is 1.04 / sqrt(2 ** p), allow three standard errors
+    assert abs(sketch.count() - len(values)) / len(values) < 3 * 1.04 / np.sqrt(2 ** 12)
+
+def test_hll_small_counts_are_exact_enough():
+    sketch = HyperLogLog()
+    sketch.update(['Jane Austen', 'J.K. Rowling', 'Jane Austen', None])
+    assert sketch.count() == 2
+
+def test_hll_merge_rejects_different_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(p=12).merge(HyperLogLog(p=10))
+
+def test_to_dict_from_dict_round_trip():
+    rng = np.random.default_rng(2)
+    kll = build_kll([rng.normal(size=3000) for _ in range(5)])
+    hll = HyperLogLog()
+    hll.update(rng.integers(0, 10000, size=20000))
+
+    restored_kll = KLLSketch.from_dict(json.loads(json.dumps(kll.to_dict())))
+    restored_hll = HyperLogLog.from_dict(json.loads(json.dumps(hll.to_dict())))
+
+    assert restored_kll.n == kll.n
+    assert [restored_kll.quantile(q) for q in (0, 0.1, 0.5, 0.9, 1)] == [kll.quantile(q) for q in (0, 0.1, 0.5, 0.9, 1)]
+    assert restored_hll.count() == hll.count()
+    assert np.array_equal(restored_hll.registers, hll.registers)
+
+    empty = KLLSketch.from_dict(KLLSketch().to_dict())
+    assert empty.n == 0 and np.isnan(empty.quantile(0.5))
+
+def sample_collection():
+    frame = pd.DataFrame({
+        'price': [5.0, 10.0, 15.0, 20.0, 25.0, 30.0],
+        'author': ['A', 'B', 'A', 'C', 'D', 'D'],
+        'book_format': ['Paperback', 'Paperback', 'Hardcover', 'Hardcover', 'Paperback', 'Kindle']
+    })
+    sketches = SketchCollection()
+    sketches.update_quantiles(frame, ['price'])
+    sketches.update_quantiles(frame, ['price'], 'book_format')
+    sketches.update_distinct(frame, 'author')
+    sketches.update_distinct(frame, 'author', 'book_format')
+    return sketches
+
+def test_save_load_round_trip(engine):
+    sketches = sample_collection()
+    save_sketches(sketches, engine)
+    loaded = load_sketches(engine)
+
+    assert set(loaded.sketches) == set(sketches.sketches)
+    assert loaded.quantile('price', 0.5) == sketches.quantile('price', 0.5)
+    assert loaded.quantile('price', 1, 'book_format', 'Paperback') == 25.0
+    assert loaded.distinct_count('author') == 4
+    assert loaded.distinct_count('author', 'book_format', 'Hardcover') == 2
+
+def test_save_without_merge_replaces_stored_sketches(engine):
+    stale = SketchCollection()
+    stale.update_quantiles(pd.DataFrame({'price': [1.0], 'genre': ['Poetry']}), ['price'], 'genre')
+    save_sketches(stale, engine)
+
+    sketches = sample_collection()
+    save_sketches(sketches, engine, merge=False)
+    save_sketches(sketches, engine, merge=False)
+    loaded = load_sketches(engine)
+
+    assert set(loaded.sketches) == set(sketches.sketches)
+    assert loaded.sketches[('kll', 'price', OVERALL, OVERALL)].n == 6
+
+def test_save_with_merge_accumulates(engine):
+    save_sketches(sample_collection(), engine)
+    save_sketches(sample_collection(), engine, merge=True)
+    loaded = load_sketches(engine)
+
+    assert loaded.sketches[('kll', 'price', OVERALL, OVERALL)].n == 12
+    assert loaded.distinct_count('author') == 4
+
+def test_failed_replace_keeps_stored_sketches(engine, monkeypatch):
+    save_sketches(sample_collection(), engine)
+
+    sketches = sample_collection()
+    frame = sketches.to_frame()
+    # Duplicate keys make the insert fail after the stored sketches were deleted
+    monkeypatch.setattr(sketches, 'to_frame', lambda: pd.concat([frame, frame]))
+    assert save_sketches(sketches, engine, merge=False) is False
+
+    loaded = load_sketches(engine)
+    assert set(loaded.sketches) == set(sample_collection().sketches)
+    assert loaded.sketches[('kll', 'price', OVERALL, OVERALL)].n == 6
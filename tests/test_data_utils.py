@@ -0,0 +1,164 @@
+import os
+import sys
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'books_dataset_normalization_and_analysis'))
+
+import data_utils
+from database_schema_tables_definition import RatingsAndBBEScores, PublicationInfo, Authors, Descriptions, DescriptionDictionaries
+from description_storage import hash_description, hash_dictionary, compress_description
+from data_utils import read_table, bulk_insert, restore_descriptions, read_csv_sample, normalize_book_id
+from data_cleaning_and_normalization import data_cleaning
+
+PUBLICATION_COLUMNS = ['index', 'book_id', 'publisher', 'publish_date', 'first_publish_date']
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'books.db'}")
+    yield engine
+    engine.dispose()
+
+def test_read_table_keeps_float_precision(engine):
+    RatingsAndBBEScores.__table__.create(engine)
+    ratings = pd.DataFrame({'book_id': [1, 2], 'rating': [4.123456789012, None], 'bbe_score': [12.16472421933329, 3.0]})
+    ratings.to_sql('ratings_and_bbe_scores', engine, if_exists='append')
+
+    data = read_table(engine, 'ratings_and_bbe_scores', ['rating', 'bbe_score'])
+
+    assert data['rating'].iloc[0] == 4.123456789012
+    assert pd.isna(data['rating'].iloc[1])
+    assert data['bbe_score'].tolist() == [12.16472421933329, 3.0]
+
+@pytest.fixture
+def publication_engine(engine):
+    PublicationInfo.__table__.create(engine)
+    Authors.__table__.create(engine)
+    return engine
+
+def publication_rows(engine):
+    with engine.connect() as connection:
+        return connection.execute(text(
+            'SELECT "index", book_id, publisher, publish_date, first_publish_date FROM publication_info ORDER BY "index"'
+        )).all()
+
+def test_partial_upsert_keeps_other_columns(publication_engine):
+    bulk_insert(PublicationInfo, [(1, 10, 'Penguin', '2001-01-01', '1999-12-31')], publication_engine, columns=PUBLICATION_COLUMNS)
+
+    assert bulk_insert(PublicationInfo, [(1, 'Vintage')], publication_engine, columns=['index', 'publisher'], upsert=True) == 1
+    frame = pd.DataFrame({'publisher': ['Faber']}, index=pd.Index([1], name='index'))
+    assert bulk_insert(PublicationInfo, frame, publication_engine, upsert=True) == 1
+
+    assert publication_rows(publication_engine) == [(1, 10, 'Faber', '2001-01-01', '1999-12-31')]
+
+def test_tuple_length_mismatch_raises_and_inserts_nothing(publication_engine):
+    rows = [(1, 'Jane Austen'), (2, 'Leo Tolstoy'), (3,)]
+    with pytest.raises(ValueError, match='Row 2 has 1 values'):
+        bulk_insert(Authors, rows, publication_engine, columns=['author_id', 'author'], batch_size=2)
+    with pytest.raises(ValueError):
+        bulk_insert(Authors, [(1, 'Jane Austen', 'extra')], publication_engine, columns=['author_id', 'author'])
+
+    with publication_engine.connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM authors')).scalar() == 0
+
+def test_unknown_column_raises(publication_engine):
+    with pytest.raises(ValueError, match='not defined'):
+        bulk_insert(Authors, [(1, 'Jane Austen')], publication_engine, columns=['author_id', 'name'])
+
+def test_date_columns_are_coerced(publication_engine):
+    rows = [
+        (1, 10, 'Penguin', '2001-05-06', datetime.date(1999, 1, 2)),
+        (2, 11, 'Vintage', datetime.datetime(2002, 3, 4, 15, 30), 'not a date'),
+    ]
+    bulk_insert(PublicationInfo, rows, publication_engine, columns=PUBLICATION_COLUMNS)
+    frame = pd.DataFrame({'book_id': [12], 'publisher': ['Faber'], 'publish_date': ['2003-07-08'], 'first_publish_date': [None]},
+                         index=pd.Index([3], name='index'))
+    bulk_insert(PublicationInfo, frame, publication_engine)
+
+    assert publication_rows(publication_engine) == [
+        (1, 10, 'Penguin', '2001-05-06', '1999-01-02'),
+        (2, 11, 'Vintage', '2002-03-04', None),
+        (3, 12, 'Faber', '2003-07-08', None),
+    ]
+
+def test_missing_values_are_written_as_null(publication_engine):
+    rows = [(1, None, float('nan'), pd.NaT, np.nan), (2, 11, pd.NA, None, '2001-01-01')]
+    bulk_insert(PublicationInfo, rows, publication_engine, columns=PUBLICATION_COLUMNS)
+    frame = pd.DataFrame({'book_id': [np.nan], 'publisher': [np.nan]}, index=pd.Index([3], name='index'))
+    bulk_insert(PublicationInfo, frame, publication_engine)
+
+    assert publication_rows(publication_engine) == [
+        (1, None, None, None, None),
+        (2, 11, None, None, '2001-01-01'),
+        (3, None, None, None, None),
+    ]
+
+def test_failed_insert_is_told_apart_from_empty_input(publication_engine):
+    assert bulk_insert(Authors, [], publication_engine, columns=['author_id', 'author']) == 0
+    assert bulk_insert(Authors, [(1, 'Jane Austen')], publication_engine, columns=['author_id', 'author']) == 1
+    assert bulk_insert(Authors, [(1, 'Jane Austen')], publication_engine, columns=['author_id', 'author']) is None
+
+def test_restore_descriptions_reads_only_referenced_rows(engine, monkeypatch):
+    Descriptions.__table__.create(engine)
+    DescriptionDictionaries.__table__.create(engine)
+    dictionary = b'a story of love and war in an old town '
+    dictionary_id = hash_dictionary(dictionary)
+    texts = [f"Book {number}: a story of love and war in an old town" for number in range(5)]
+    # Odd descriptions use the shared dictionary, even ones were stored without one
+    rows = [
+        (hash_description(text), compress_description(text, dictionary), dictionary_id) if number % 2
+        else (hash_description(text), compress_description(text), None)
+        for number, text in enumerate(texts)
+    ]
+    bulk_insert(DescriptionDictionaries, [(dictionary_id, dictionary)], engine)
+    bulk_insert(Descriptions, rows, engine, columns=['description_hash', 'description', 'dictionary_id'])
+
+    decompressed = []
+    decompress = data_utils.decompress_description
+    monkeypatch.setattr(data_utils, 'decompress_description', lambda data, dictionary=b'': decompressed.append(data) or decompress(data, dictionary))
+    books = pd.DataFrame({
+        'title': ['Zero', 'Three', 'Three again', 'Inline'],
+        'description': [None, None, None, 'Kept inline'],
+        'description_hash': [hash_description(texts[0]), hash_description(texts[3]), hash_description(texts[3]), None]
+    })
+
+    restored = restore_descriptions(books, engine)
+
+    assert restored['description'].tolist() == [texts[0], texts[3], texts[3], 'Kept inline']
+    assert 'description_hash' not in restored.columns
+    assert len(decompressed) == 2
+
+@pytest.fixture
+def books_csv(tmp_path):
+    # Only the columns used here carry data, the rest keep the CSV layout expected by data_cleaning
+    columns = ['bookId', 'title', 'series', 'author', 'rating', 'description', 'language', 'isbn', 'genres',
+               'characters', 'bookFormat', 'edition', 'pages', 'publisher', 'publishDate', 'firstPublishDate',
+               'awards', 'numRatings', 'ratingsByStars', 'likedPercent', 'setting', 'coverImg', 'bbeScore',
+               'bbeVotes', 'price']
+    books = pd.DataFrame({column: [''] * 4000 for column in columns})
+    books['bookId'] = [f"{number // 2}.Title_{number // 2}" if number % 2 else f"{number // 2}-title-{number}" for number in range(4000)]
+    books['author'] = 'Jane Austen'
+    books['pages'] = '100 pages'
+    path = tmp_path / 'books.csv'
+    books.to_csv(path, index=False)
+    return path
+
+def test_read_csv_sample_selects_whole_books_deterministically(books_csv):
+    sample = read_csv_sample(books_csv, 0.1, chunksize=500)
+
+    assert sample.equals(read_csv_sample(books_csv, 0.1, chunksize=1000))
+    book_ids = sample['bookId'].apply(normalize_book_id)
+    # Both rows of every sampled book are kept
+    assert (book_ids.value_counts() == 2).all()
+    assert 100 < book_ids.nunique() < 300
+    # The sampled identifiers are the ones data_cleaning produces
+    assert sorted(data_cleaning(sample.copy())['book_id']) == sorted(book_ids.astype(int).unique())
+
+@pytest.mark.parametrize('sample_rate', [0, -0.5, 1.5, float('nan'), 0.00004])
+def test_read_csv_sample_rejects_invalid_rates(books_csv, sample_rate):
+    with pytest.raises(ValueError):
+        read_csv_sample(books_csv, sample_rate)